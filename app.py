@@ -2,13 +2,24 @@ import os
 import psycopg2
 import psycopg2.extras
 from psycopg2 import sql # Importação necessária para updates seguros
-from flask import Flask, jsonify, request, send_from_directory, render_template, abort
+from flask import Flask, jsonify, request, send_from_directory, render_template, abort, Response
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
 from flask_cors import CORS
 import datetime
 import decimal
 import json
+import hashlib
 import traceback
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# orjson é opcional: se não estiver instalado, o jsonify usa o encoder padrão
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- IMPORTAÇÕES PARA O FUNIL ---
 import requests
@@ -22,10 +33,49 @@ load_dotenv()
 DATABASE_URL = os.getenv('DATABASE_URL')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 PAGESPEED_API_KEY = os.getenv('PAGESPEED_API_KEY') # API Key do Google PageSpeed
+# O lote faz streaming longo: exige gunicorn com worker gthread (ver render.yaml)
+DIAG_LOTE_MAX_URLS = int(os.getenv('DIAG_LOTE_MAX_URLS', 500)) # Limite de URLs por lote
+DIAG_LOTE_WORKERS = int(os.getenv('DIAG_LOTE_WORKERS', 8)) # Chamadas PageSpeed simultâneas
+DIAG_LOTE_CHUNK = int(os.getenv('DIAG_LOTE_CHUNK', 25)) # Leads gravados por INSERT durante o lote
+HOME_CACHE_TTL = int(os.getenv('HOME_CACHE_TTL', 300)) # Segundos que a home renderizada fica em cache
+HOME_CACHE_RETRY = int(os.getenv('HOME_CACHE_RETRY', 30)) # Espera antes de tentar o banco de novo após falha
+HOME_DB_TIMEOUT = int(os.getenv('HOME_DB_TIMEOUT', 3)) # Segundos máximos de conexão/consulta ao montar a home
 # --- FIM DA CONFIGURAÇÃO ---
 
 # --- INICIALIZAÇÃO DO FLASK ---
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Serializador do jsonify: usa orjson quando disponível. O encoder padrão
+    (fallback) gera a mesma saída: datetime em ISO, Decimal -> float e
+    chaves ordenadas.
+    """
+    ensure_ascii = False
+    sort_keys = True
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+        return DefaultJSONProvider.default(value)
+
+    def dumps(self, obj, **kwargs):
+        indent = kwargs.get('indent')
+        if orjson is not None and set(kwargs) <= {'indent', 'separators'} and indent in (None, 2):
+            option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+            except orjson.JSONEncodeError:
+                pass  # ex.: inteiros acima de 64 bits; o encoder padrão resolve
+        if indent is None:
+            kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
 app = Flask(__name__, template_folder='templates', static_folder='.')
+app.json = FastJSONProvider(app)
 CORS(app) 
 
 # --- FUNÇÃO DE SETUP DO BANCO DE DADOS ---
@@ -210,10 +260,16 @@ except Exception as e:
 
 
 # --- FUNÇÕES DE BANCO DE DADOS ---
-def get_db_connection():
-    conn = psycopg2.connect(DATABASE_URL)
+def get_db_connection(**kwargs):
+    conn = psycopg2.connect(DATABASE_URL, **kwargs)
     return conn
 
+def json_response(json_text, status=200):
+    """
+    Devolve um JSON já serializado (ex.: vindo do json_agg do Postgres) sem re-encodar.
+    """
+    return app.response_class(json_text, status=status, mimetype='application/json')
+
 def format_db_data(data_dict):
     if not isinstance(data_dict, dict):
         return data_dict
@@ -251,6 +307,13 @@ def fetch_full_pagespeed_json(url_to_check, api_key):
         print(f"❌ ERRO Inesperado [PageSpeed]: {e}")
         return None, "Erro: Não foi possível analisar essa URL."
 
+def extract_seo_score(report_json):
+    """
+    Extrai a nota de SEO (0-100). O Lighthouse devolve score null quando a categoria falha.
+    """
+    score = report_json.get('lighthouseResult', {}).get('categories', {}).get('seo', {}).get('score')
+    return (score or 0) * 100
+
 def extract_failing_audits(report_json):
     """
     Extrai uma lista de auditorias que falharam (score != 1).
@@ -272,6 +335,77 @@ def extract_failing_audits(report_json):
 
 # --- ENDPOINTS DE API (RETORNAM JSON) ---
 
+# Consultas da home. O Postgres monta o JSON (json_agg), então não há
+# conversão linha a linha em Python nem re-encode no Flask.
+BLOG_HOME_SQL = (
+    "SELECT id, titulo, subtitulo, imagem_url, slug, data_publicacao "
+    "FROM leanttro_blog "
+    "WHERE publicado = true "
+    "ORDER BY data_publicacao DESC, id DESC "
+    "LIMIT 5"
+)
+BLOG_HOME_ORDEM = "t.data_publicacao DESC, t.id DESC"
+
+# --- [ALTERAÇÃO 2 (API)] ---
+PROJETOS_HOME_SQL = (
+    "SELECT "
+    "    id, "
+    "    titulo AS title, "
+    "    short_title AS shortTitle, "
+    "    long_description AS longDescription, "
+    "    skills, "
+    "    github_link AS githubLink, "
+    "    live_link AS liveLink, "
+    "    live_link_text AS liveLinkText, "
+    "    disclaimer, "
+    "    image_src AS imagem_url, "
+    "    case_study_link AS caseStudyLink, "
+    "    slug, "
+    "    ordem "
+    "FROM leanttro_projetos "
+    "WHERE publicado = true "
+    "ORDER BY ordem ASC, id ASC"
+)
+# Desempate por id: vários projetos ficam com o default ordem = 0
+PROJETOS_HOME_ORDEM = "t.ordem ASC, t.id ASC"
+# --- [FIM DA ALTERAÇÃO 2] ---
+
+def json_agg_sql(query, ordem):
+    """
+    Envolve uma consulta para o Postgres devolver todas as linhas como um array JSON.
+    A ordenação vai dentro do json_agg: a ordem da subconsulta não é garantida no agregado.
+    """
+    return f"(SELECT COALESCE(json_agg(t ORDER BY {ordem}), '[]'::json) FROM ({query}) t)"
+
+def buscar_json(conn, query):
+    """
+    Executa a consulta e retorna o JSON (texto) gerado pelo Postgres.
+    """
+    cur = conn.cursor()
+    cur.execute(f"SELECT {query}::text;")
+    json_text = cur.fetchone()[0]
+    cur.close()
+    return json_text
+
+def buscar_dados_home():
+    """
+    Busca blog + projetos numa única consulta (payload combinado da home, em JSON).
+    Usa timeouts curtos: a primeira renderização da home não pode esperar por um banco lento.
+    """
+    conn = None
+    try:
+        conn = get_db_connection(
+            connect_timeout=HOME_DB_TIMEOUT,
+            options=f"-c statement_timeout={HOME_DB_TIMEOUT * 1000}"
+        )
+        return buscar_json(
+            conn,
+            f"json_build_object('blog', {json_agg_sql(BLOG_HOME_SQL, BLOG_HOME_ORDEM)}, "
+            f"'projetos', {json_agg_sql(PROJETOS_HOME_SQL, PROJETOS_HOME_ORDEM)})"
+        )
+    finally:
+        if conn: conn.close()
+
 @app.route('/api/leanttro_blog', methods=['GET'])
 def get_blog_posts():
     """
@@ -280,18 +414,7 @@ def get_blog_posts():
     conn = None
     try:
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cur.execute(
-            "SELECT id, titulo, subtitulo, imagem_url, slug, data_publicacao "
-            "FROM leanttro_blog "
-            "WHERE publicado = true "
-            "ORDER BY data_publicacao DESC "
-            "LIMIT 5;"
-        )
-        posts_raw = cur.fetchall()
-        cur.close()
-        posts = [format_db_data(dict(post)) for post in posts_raw]
-        return jsonify(posts)
+        return json_response(buscar_json(conn, json_agg_sql(BLOG_HOME_SQL, BLOG_HOME_ORDEM)))
     except Exception as e:
         print(f"ERRO no endpoint /api/leanttro_blog: {e}")
         return jsonify({'error': 'Erro interno ao buscar posts.'}), 500
@@ -306,41 +429,23 @@ def get_projetos():
     conn = None
     try:
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        # --- [ALTERAÇÃO 2 (API)] ---
-        cur.execute(
-            "SELECT "
-            "    id, "
-            "    titulo AS title, "
-            "    short_title AS shortTitle, "
-            "    long_description AS longDescription, "
-            "    skills, "
-            "    github_link AS githubLink, "
-            "    live_link AS liveLink, "
-            "    live_link_text AS liveLinkText, "
-            "    disclaimer, "
-            "    image_src AS imagem_url, "
-            "    case_study_link AS caseStudyLink, "
-            "    slug "
-            "FROM leanttro_projetos "
-            "WHERE publicado = true "
-            "ORDER BY ordem ASC;"
-        )
-        # --- [FIM DA ALTERAÇÃO 2] ---
-        
-        projetos_raw = cur.fetchall()
-        cur.close()
-        
-        projetos = [format_db_data(dict(proj)) for proj in projetos_raw]
-        return jsonify(projetos)
-        
+        return json_response(buscar_json(conn, json_agg_sql(PROJETOS_HOME_SQL, PROJETOS_HOME_ORDEM)))
     except Exception as e:
         print(f"ERRO no endpoint /api/leanttro_projetos: {e}")
         return jsonify({'error': 'Erro interno ao buscar projetos.'}), 500
     finally:
         if conn: conn.close()
 
+@app.route('/api/home', methods=['GET'])
+def get_home():
+    """
+    API combinada da home: blog + projetos numa única requisição.
+    """
+    try:
+        return json_response(obter_dados_home_cache())
+    except Exception as e:
+        print(f"ERRO no endpoint /api/home: {e}")
+        return jsonify({'error': 'Dados da home indisponíveis no momento.'}), 503
 
 # --- ENDPOINT DE DIAGNÓSTICO DE SEO ---
 @app.route('/api/diagnostico_seo', methods=['POST'])
@@ -366,7 +471,7 @@ def handle_diagnostico_e_isca():
         if user_error:
             return jsonify({"error": user_error}), 502
             
-        user_seo_score = (user_report.get('lighthouseResult', {}).get('categories', {}).get('seo', {}).get('score', 0)) * 100
+        user_seo_score = extract_seo_score(user_report)
         user_seo_score_int = int(user_seo_score)
 
         # 2. Salvar na Tabela 'leanttro_leads' (Lead Frio)
@@ -448,6 +553,151 @@ def handle_diagnostico_e_isca():
 # --- FIM DO ENDPOINT DE DIAGNÓSTICO ---
 
 
+# --- ENDPOINT DE DIAGNÓSTICO EM LOTE ---
+def diagnosticar_url_lote(url_analisada):
+    """
+    Roda o PageSpeed para uma URL do lote e devolve um dict com o resultado.
+    """
+    user_report, user_error = fetch_full_pagespeed_json(url_analisada, PAGESPEED_API_KEY)
+    if user_error:
+        return {'url_analisada': url_analisada, 'success': False, 'error': user_error}
+
+    return {
+        'url_analisada': url_analisada,
+        'success': True,
+        'seo_score': int(extract_seo_score(user_report)),
+        'num_falhas': len(extract_failing_audits(user_report))
+    }
+
+def salvar_leads_lote(resultados):
+    """
+    Salva um bloco de leads diagnosticados do lote com um único INSERT multi-linha.
+    Retorna um dict {url_analisada: lead_id} (o RETURNING não garante a ordem do VALUES).
+    """
+    if not resultados:
+        return {}
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        rows = psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO leanttro_leads (url_analisada, score_seo, origem, status_analise) "
+            "VALUES %s "
+            "RETURNING id, url_analisada;",
+            [(r['url_analisada'], r['seo_score']) for r in resultados],
+            template="(%s, %s, 'SEO_DIAGNOSTICO_LOTE', 'DIAGNOSTICADO')",
+            page_size=len(resultados),
+            fetch=True
+        )
+        conn.commit()
+        cur.close()
+        return {url: lead_id for lead_id, url in rows}
+    except Exception:
+        if conn: conn.rollback()
+        raise
+    finally:
+        if conn: conn.close()
+
+@app.route('/api/diagnostico_seo/lote', methods=['POST'])
+def handle_diagnostico_lote():
+    """
+    API de diagnóstico em lote (equipe comercial).
+    Recebe {"urls": [...]} e devolve NDJSON: uma linha por URL assim que o
+    PageSpeed termina, e uma linha final 'resumo' com os IDs dos leads salvos.
+    """
+    print("\n--- [FUNIL-LOTE] Recebido trigger para /api/diagnostico_seo/lote ---")
+
+    if not PAGESPEED_API_KEY:
+        print("❌ ERRO: PAGESPEED_API_KEY não definida.")
+        return jsonify({"error": "Erro: O servidor não está configurado para o diagnóstico."}), 500
+
+    data = request.json
+    urls = data.get('urls') if isinstance(data, dict) else None
+    if not isinstance(urls, list) or not urls:
+        return jsonify({'error': 'Lista de URLs é obrigatória'}), 400
+
+    # Remove vazias e duplicadas mantendo a ordem
+    urls = list(dict.fromkeys(u.strip() for u in urls if isinstance(u, str) and u.strip()))
+    if not urls:
+        return jsonify({'error': 'Lista de URLs é obrigatória'}), 400
+    if len(urls) > DIAG_LOTE_MAX_URLS:
+        return jsonify({'error': f'Máximo de {DIAG_LOTE_MAX_URLS} URLs por lote.'}), 400
+
+    def gerar_ndjson():
+        pendentes = []
+        leads = []
+        status = {'sucesso': 0, 'erro_db': False}
+
+        def salvar_pendentes():
+            # Grava o bloco pendente; se o cliente cair, o que já foi diagnosticado não se perde
+            if not pendentes:
+                return
+            bloco = list(pendentes)
+            pendentes.clear()
+            try:
+                print(f"ℹ️  [DB] Salvando {len(bloco)} leads do lote...")
+                lead_ids = salvar_leads_lote(bloco)
+                leads.extend(
+                    {'url_analisada': r['url_analisada'], 'lead_id': lead_ids[r['url_analisada']]}
+                    for r in bloco
+                )
+                print(f"✅  [DB] {len(lead_ids)} leads do lote salvos.")
+            except Exception as e:
+                print(f"❌ ERRO CRÍTICO [Lote] ao salvar leads: {e}")
+                traceback.print_exc()
+                status['erro_db'] = True
+
+        num_workers = min(DIAG_LOTE_WORKERS, len(urls))
+        print(f"ℹ️  [Lote] Diagnosticando {len(urls)} URLs com {num_workers} workers...")
+
+        executor = ThreadPoolExecutor(max_workers=num_workers)
+        futures = {}
+        lidos = set()
+        try:
+            futures = {executor.submit(diagnosticar_url_lote, url): url for url in urls}
+            for future in as_completed(futures):
+                lidos.add(future)
+                try:
+                    resultado = future.result()
+                except Exception as e:
+                    print(f"❌ ERRO [Lote] ao diagnosticar {futures[future]}: {e}")
+                    resultado = {'url_analisada': futures[future], 'success': False, 'error': 'Erro: Não foi possível analisar essa URL.'}
+                if resultado['success']:
+                    status['sucesso'] += 1
+                    pendentes.append(resultado)
+                    if len(pendentes) >= DIAG_LOTE_CHUNK:
+                        salvar_pendentes()
+                yield app.json.dumps({'tipo': 'resultado', **resultado}) + "\n"
+        finally:
+            # Cliente desconectado (GeneratorExit) ou erro: descarta o que ainda está na fila
+            executor.shutdown(wait=False, cancel_futures=True)
+            # Resultados já concluídos mas ainda não enviados: o PageSpeed já rodou, então salva o lead
+            for future in futures:
+                if future in lidos or not future.done() or future.cancelled() or future.exception():
+                    continue
+                resultado = future.result()
+                if resultado['success']:
+                    status['sucesso'] += 1
+                    pendentes.append(resultado)
+            salvar_pendentes()
+
+        resumo = {
+            'tipo': 'resumo',
+            'total': len(urls),
+            'sucesso': status['sucesso'],
+            'falhas': len(urls) - status['sucesso'],
+            'leads': leads
+        }
+        if status['erro_db']:
+            resumo['error'] = 'Erro interno ao salvar os leads do lote.'
+        yield app.json.dumps(resumo) + "\n"
+
+    return Response(gerar_ndjson(), mimetype='application/x-ndjson')
+# --- FIM DO ENDPOINT DE DIAGNÓSTICO EM LOTE ---
+
+
 # --- /api/orcar (CREATE) ---
 @app.route('/api/orcar', methods=['POST'])
 def handle_orcamento_create():
@@ -683,10 +933,91 @@ def get_projeto_detalhe(slug):
 
 # --- ROTAS ESTÁTICAS (DEVE VIR POR ÚLTIMO) ---
 
+# --- CACHE DA HOME (dados + HTML pré-renderizado) ---
+_home_cache = {
+    'dados': None, 'dados_em': 0.0, 'retry_em': 0.0, 'atualizando': False,
+    'html': None, 'etag': None, 'html_chave': None
+}
+_home_cache_lock = threading.Lock()
+
+def obter_dados_home_cache():
+    """
+    Retorna o JSON de blog + projetos, consultando o banco no máximo uma vez por HOME_CACHE_TTL.
+    Só uma requisição atualiza por vez; as demais recebem o cache antigo (ou erro, se ainda
+    não houver cache). Se o banco falhar, só tenta de novo após HOME_CACHE_RETRY.
+    """
+    with _home_cache_lock:
+        agora = time.time()
+        dados = _home_cache['dados']
+        fresco = dados is not None and agora - _home_cache['dados_em'] < HOME_CACHE_TTL
+        if fresco or _home_cache['atualizando'] or agora < _home_cache['retry_em']:
+            if dados is not None:
+                return dados
+            raise RuntimeError("Dados da home ainda não disponíveis.")
+        _home_cache['atualizando'] = True
+
+    try:
+        novos = buscar_dados_home()
+    except Exception as e:
+        with _home_cache_lock:
+            _home_cache['atualizando'] = False
+            _home_cache['retry_em'] = time.time() + HOME_CACHE_RETRY
+        if dados is not None:
+            print(f"ERRO ao atualizar dados da home, servindo cache antigo: {e}")
+            return dados
+        raise
+
+    with _home_cache_lock:
+        _home_cache['dados'] = novos
+        _home_cache['dados_em'] = time.time()
+        _home_cache['retry_em'] = 0.0
+        _home_cache['atualizando'] = False
+        _home_cache['html'] = None
+    return novos
+
+def renderizar_index_com_dados():
+    """
+    Injeta os dados da home no 'index.html' (window.__HOME_DATA__), evitando
+    as chamadas de API no carregamento. O HTML fica em cache até os dados
+    expirarem ou o arquivo mudar. Retorna (html, etag).
+    """
+    dados = obter_dados_home_cache()
+    index_path = os.path.join(app.root_path, 'index.html')
+    chave = (dados, os.path.getmtime(index_path))
+
+    with _home_cache_lock:
+        if _home_cache['html'] is not None and _home_cache['html_chave'] == chave:
+            return _home_cache['html'], _home_cache['etag']
+
+    with open(index_path, encoding='utf-8') as f:
+        html = f.read()
+    # '<' escapado para o JSON não conseguir fechar a tag <script>
+    dados_js = dados.replace('<', '\\u003c')
+    script = f'<script>window.__HOME_DATA__ = {dados_js};</script>\n</head>'
+    html = html.replace('</head>', script, 1)
+    etag = hashlib.sha1(html.encode('utf-8')).hexdigest()
+
+    with _home_cache_lock:
+        _home_cache['html'] = html
+        _home_cache['etag'] = etag
+        _home_cache['html_chave'] = chave
+    return html, etag
+
 @app.route('/')
 def index_route():
-    """Serve o 'index.html' como a página raiz."""
-    return send_from_directory('.', 'index.html')
+    """Serve o 'index.html' como a página raiz, já com os dados da home embutidos."""
+    try:
+        html, etag = renderizar_index_com_dados()
+    except Exception as e:
+        # Sem banco: serve o arquivo puro e o frontend busca /api/home sozinho
+        print(f"ERRO ao pré-renderizar a home: {e}")
+        return send_from_directory('.', 'index.html')
+
+    # ETag do HTML renderizado: visitas repetidas recebem 304 sem baixar a página
+    resp = Response(html, mimetype='text/html')
+    resp.set_etag(etag)
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
 
 @app.route('/<path:path>')
 def serve_static_files(path):
@@ -0,0 +1,144 @@
+"""
+Micro-benchmark da serialização JSON das listagens (blog/projetos).
+
+[Banco] compara o caminho antigo das listagens (RealDictCursor + format_db_data
++ jsonify) com o atual (json_agg no Postgres devolvido como texto). Usa tabelas
+TEMP com linhas sintéticas, que só existem na sessão do benchmark e escondem as
+tabelas reais: nenhum dado do banco é lido ou alterado. Requer DATABASE_URL.
+
+[jsonify] compara o FastJSONProvider com e sem orjson (mesma saída). Vale para
+as respostas que ainda passam pelo jsonify (lote NDJSON, erros).
+
+Uso: python bench_serializacao.py [num_linhas]
+"""
+import sys
+import timeit
+import datetime
+import decimal
+
+import psycopg2.extras
+from flask.json.provider import DefaultJSONProvider
+
+import app as leanttro_app
+
+CREATE_TEMP_SQL = """
+CREATE TEMP TABLE leanttro_projetos (
+    id SERIAL PRIMARY KEY,
+    ordem INTEGER DEFAULT 0,
+    titulo TEXT NOT NULL,
+    short_title TEXT,
+    long_description TEXT,
+    skills TEXT[],
+    github_link TEXT,
+    live_link TEXT,
+    live_link_text TEXT,
+    disclaimer TEXT,
+    image_src TEXT,
+    case_study_link TEXT,
+    publicado BOOLEAN DEFAULT true,
+    slug TEXT UNIQUE
+);
+CREATE TEMP TABLE leanttro_blog (
+    id SERIAL PRIMARY KEY,
+    titulo TEXT NOT NULL,
+    subtitulo TEXT,
+    imagem_url TEXT,
+    conteudo_html TEXT NOT NULL,
+    data_publicacao DATE DEFAULT CURRENT_DATE,
+    slug TEXT UNIQUE NOT NULL,
+    publicado BOOLEAN DEFAULT false
+);
+"""
+
+SEED_SQL = """
+INSERT INTO leanttro_projetos (ordem, titulo, short_title, long_description, skills,
+                               github_link, image_src, slug)
+SELECT i, 'Projeto ' || i, 'P' || i, repeat('Pipeline de dados com Python, SQL e GCP. ', 10),
+       ARRAY['Python', 'SQL', 'Power BI', 'N8N'],
+       'https://github.com/leanttro/projeto-' || i, 'projeto-' || (i %% 6 + 1) || '.png', 'projeto-' || i
+FROM generate_series(1, %(n)s) AS i;
+INSERT INTO leanttro_blog (titulo, subtitulo, imagem_url, conteudo_html, data_publicacao, slug, publicado)
+SELECT 'Post ' || i, 'Subtítulo ' || i, 'post-' || i || '.png', '<p>...</p>',
+       CURRENT_DATE - i, 'post-' || i, true
+FROM generate_series(1, %(n)s) AS i;
+"""
+
+
+# Mesma consulta do carrossel, sem o LIMIT 5, para medir o blog com listas grandes
+BLOG_SEM_LIMITE_SQL = leanttro_app.BLOG_HOME_SQL.rsplit(' LIMIT ', 1)[0]
+
+
+def bench(nome, func, repeticoes):
+    melhor = min(timeit.repeat(func, number=repeticoes, repeat=5)) / repeticoes
+    print(f"  {nome:<45} {melhor * 1000:8.3f} ms")
+    return melhor
+
+
+def bench_banco(num_linhas, repeticoes):
+    if not leanttro_app.DATABASE_URL:
+        print("[Banco] DATABASE_URL não definida, pulando.")
+        return
+
+    flask_app = leanttro_app.app
+    jsonify_antigo = DefaultJSONProvider(flask_app)
+    conn = leanttro_app.get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(CREATE_TEMP_SQL)
+        cur.execute(SEED_SQL, {'n': num_linhas})
+        cur.close()
+
+        for nome, query, ordem in [
+            ('leanttro_projetos', leanttro_app.PROJETOS_HOME_SQL, leanttro_app.PROJETOS_HOME_ORDEM),
+            ('leanttro_blog (LIMIT 5)', leanttro_app.BLOG_HOME_SQL, leanttro_app.BLOG_HOME_ORDEM),
+            ('leanttro_blog (sem LIMIT)', BLOG_SEM_LIMITE_SQL, leanttro_app.BLOG_HOME_ORDEM),
+        ]:
+            def caminho_antigo():
+                cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                cur.execute(query)
+                linhas = [leanttro_app.format_db_data(dict(l)) for l in cur.fetchall()]
+                cur.close()
+                return jsonify_antigo.response(linhas)
+
+            def caminho_json_agg():
+                return leanttro_app.json_response(
+                    leanttro_app.buscar_json(conn, leanttro_app.json_agg_sql(query, ordem))
+                )
+
+            print(f"[Banco] {nome}, {num_linhas} linhas na tabela")
+            antigo = bench("RealDictCursor + format_db_data + jsonify", caminho_antigo, repeticoes)
+            novo = bench("json_agg no Postgres (texto direto)", caminho_json_agg, repeticoes)
+            print(f"  ganho: {antigo / novo:.1f}x")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def bench_jsonify(num_linhas, repeticoes):
+    if leanttro_app.orjson is None:
+        print("[jsonify] orjson não instalado, pulando.")
+        return
+
+    agora = datetime.datetime.now(datetime.timezone.utc)
+    linhas = [
+        {'url_analisada': f'https://site-{i}.com.br', 'success': True, 'seo_score': 87,
+         'score': decimal.Decimal('0.87'), 'data_captura': agora}
+        for i in range(num_linhas)
+    ]
+    provider = leanttro_app.app.json
+    orjson = leanttro_app.orjson
+
+    print(f"[jsonify] {num_linhas} linhas")
+    rapido = bench("FastJSONProvider com orjson", lambda: provider.dumps(linhas), repeticoes)
+    leanttro_app.orjson = None
+    try:
+        padrao = bench("FastJSONProvider sem orjson (fallback)", lambda: provider.dumps(linhas), repeticoes)
+    finally:
+        leanttro_app.orjson = orjson
+    print(f"  ganho: {padrao / rapido:.1f}x")
+
+
+if __name__ == '__main__':
+    num_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    bench_banco(num_linhas, repeticoes=20)
+    bench_jsonify(num_linhas, repeticoes=20)